@@ -6,6 +6,7 @@ Outputs a JSON file with total scores for each piece.
 
 import json
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # Import the scorer module
@@ -21,19 +22,33 @@ def main():
         print("No MusicXML files found in baseline directory", file=sys.stderr)
         return 1
 
+    # Each piece is scored independently, so spread them over all cores.
+    # Only the total score is recorded, so one optimal fingering is enough.
+    results = {}
+    with ProcessPoolExecutor() as executor:
+        futures = {
+            executor.submit(calculate_optimal_score, str(filepath), max_solutions=1): filepath
+            for filepath in musicxml_files
+        }
+        for future in as_completed(futures):
+            filepath = futures[future]
+            result = future.result()
+            results[filepath.name] = result
+
+            print(f"Processed {filepath.name}", file=sys.stderr)
+            if 'error' in result:
+                print(f"  ERROR: {result['error']}", file=sys.stderr)
+            else:
+                print(f"  Total score: {result['total_score']}", file=sys.stderr)
+
+    # Keep the output ordered by filename regardless of completion order
     baseline_scores = {}
-
     for filepath in musicxml_files:
-        print(f"Processing {filepath.name}...", file=sys.stderr)
-        result = calculate_optimal_score(str(filepath))
-
+        result = results[filepath.name]
         if 'error' in result:
-            print(f"  ERROR: {result['error']}", file=sys.stderr)
             baseline_scores[filepath.name] = {"error": result['error']}
         else:
-            total_score = result['total_score']
-            baseline_scores[filepath.name] = total_score
-            print(f"  Total score: {total_score}", file=sys.stderr)
+            baseline_scores[filepath.name] = result['total_score']
 
     # Output JSON to stdout
     print(json.dumps(baseline_scores, indent=2))
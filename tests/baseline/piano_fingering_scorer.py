@@ -10,19 +10,29 @@ specification and uses DP to compute provably optimal scores for regression test
 """
 
 import xml.etree.ElementTree as ET
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple, Optional, Set
+from typing import Callable, List, Dict, Iterable, Iterator, Tuple, Optional, Sequence, Set
 from itertools import permutations, product
 from pathlib import Path
+from types import SimpleNamespace
+import hashlib
 import json
+import mmap
+import os
 import sys
-from functools import lru_cache
+from functools import lru_cache, partial
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml is optional; fall back to the stdlib parser
+    lxml_etree = None
 
 # =============================================================================
 # Data Structures
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Note:
     """Represents a single note."""
     pitch: int          # Modified keyboard distance (0-14 per octave + octave*14)
@@ -37,10 +47,10 @@ class Note:
         """Get absolute pitch using modified keyboard system."""
         return self.octave * 14 + self.pitch
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Slice:
     """A vertical time segment containing simultaneously played notes."""
-    notes: List[Note]
+    notes: Tuple[Note, ...]
     
     @property
     def is_monophonic(self) -> bool:
@@ -50,14 +60,32 @@ class Slice:
     def pitches(self) -> Tuple[int, ...]:
         return tuple(sorted(n.absolute_pitch for n in self.notes))
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Hand:
     """Represents one hand's sequence of slices."""
-    slices: List[Slice]
+    slices: Tuple[Slice, ...]
     is_right: bool
+    # CSR layout of the sorted slice pitches, built once per hand:
+    # slice i is pitches_flat[slice_offsets[i]:slice_offsets[i + 1]]
+    pitches_flat: array = field(init=False, repr=False, compare=False)
+    slice_offsets: array = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        pitches_flat, slice_offsets = array('i'), array('i', [0])
+        for s in self.slices:
+            pitches_flat.extend(sorted(n.absolute_pitch for n in s.notes))
+            slice_offsets.append(len(pitches_flat))
+        object.__setattr__(self, 'pitches_flat', pitches_flat)
+        object.__setattr__(self, 'slice_offsets', slice_offsets)
     
     def __len__(self):
         return len(self.slices)
+    
+    def slice_pitches(self) -> List[List[int]]:
+        """Sorted pitches of every slice, read from the flat pitch buffer."""
+        pitches_flat, offsets = self.pitches_flat, self.slice_offsets
+        return [pitches_flat[offsets[i]:offsets[i + 1]].tolist()
+                for i in range(len(self.slices))]
 
 # =============================================================================
 # Distance Matrix (Medium Hand - Default)
@@ -78,60 +106,66 @@ DISTANCE_MATRIX_RIGHT = {
     (4, 5): (1, 1, 1, 2, 4, 6),
 }
 
+def _mirror_limits(limits: Tuple[int, ...]) -> Tuple[int, int, int, int, int, int]:
+    """Swap min/max and negate: the limits seen from the opposite direction."""
+    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = limits
+    return (-max_prac, -max_comf, -max_rel, -min_rel, -min_comf, -min_prac)
+
+def _build_distance_limits() -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """
+    Expand DISTANCE_MATRIX_RIGHT into a dense right-hand table indexed [f1][f2].
+    Index 0 is unused by real fingerings and holds the fallback limits.
+    """
+    table = []
+    for f1 in range(6):
+        row = []
+        for f2 in range(6):
+            if f1 == f2:
+                row.append((0, 0, 0, 0, 0, 0))
+                continue
+            # Fallback for any missing pairs (symmetric, so mirroring is a no-op)
+            limits = DISTANCE_MATRIX_RIGHT.get((min(f1, f2), max(f1, f2)),
+                                               (-20, -15, -5, 5, 15, 20))
+            if f1 > f2:
+                limits = _mirror_limits(limits)
+            row.append(limits)
+        table.append(tuple(row))
+    return tuple(table)
+
+# DIST_LIMITS[f1][f2] = right-hand (MinPrac, MinComf, MinRel, MaxRel, MaxComf, MaxPrac)
+DIST_LIMITS = _build_distance_limits()
+
+# HAND_DIST_LIMITS[f1][f2][is_right] = limits for that hand, so lookups need
+# no mirroring at call time (index 0 = left hand, 1 = right hand)
+HAND_DIST_LIMITS = tuple(
+    tuple((_mirror_limits(limits), limits) for limits in row)
+    for row in DIST_LIMITS
+)
+
 def get_distance_limits(f1: int, f2: int, is_right: bool) -> Tuple[int, int, int, int, int, int]:
     """
     Get distance limits for a finger pair.
     Returns (MinPrac, MinComf, MinRel, MaxRel, MaxComf, MaxPrac).
     
-    For left hand, swap finger order and negate values appropriately.
+    For left hand, min/max are swapped and negated (precomputed).
     """
-    if f1 == f2:
-        return (0, 0, 0, 0, 0, 0)
-    
-    # Normalize to canonical order (smaller finger first)
-    if f1 > f2:
-        f1, f2 = f2, f1
-        swapped = True
-    else:
-        swapped = False
-    
-    limits = DISTANCE_MATRIX_RIGHT.get((f1, f2))
-    if limits is None:
-        # Fallback for any missing pairs
-        return (-20, -15, -5, 5, 15, 20)
-    
-    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = limits
-    
-    if swapped:
-        # Swap min/max and negate
-        min_prac, max_prac = -max_prac, -min_prac
-        min_comf, max_comf = -max_comf, -min_comf
-        min_rel, max_rel = -max_rel, -min_rel
-    
-    if not is_right:
-        # For left hand, swap finger pair order interpretation
-        # This effectively negates all values
-        min_prac, max_prac = -max_prac, -min_prac
-        min_comf, max_comf = -max_comf, -min_comf
-        min_rel, max_rel = -max_rel, -min_rel
-    
-    return (min_prac, min_comf, min_rel, max_rel, max_comf, max_prac)
+    return HAND_DIST_LIMITS[f1][f2][is_right]
 
 # =============================================================================
 # Rule Implementations
 # =============================================================================
 
-def is_black_key(pitch: int) -> bool:
-    """Check if a pitch (in modified keyboard system) is a black key."""
-    return (pitch % 14) % 2 == 1 and (pitch % 14) not in [5, 13]  # imaginary keys at 5, 13
+# Key colours as ints so rules compare small ints instead of strings
+WHITE_KEY = 0
+BLACK_KEY = 1
+
+# In modified system: 0=C, 1=C#, 2=D, 3=D#, 4=E, 5=imaginary, 6=F, 7=F#, 8=G, 9=G#, 10=A, 11=A#, 12=B, 13=imaginary
+# Black keys: 1, 3, 7, 9, 11 (imaginary keys 5, 13 are white)
+BLACK_MASK = (1 << 1) | (1 << 3) | (1 << 7) | (1 << 9) | (1 << 11)
 
-def pitch_to_key_color(pitch: int) -> str:
-    """Determine if pitch is white or black key."""
-    p = pitch % 14
-    # In modified system: 0=C, 1=C#, 2=D, 3=D#, 4=E, 5=imaginary, 6=F, 7=F#, 8=G, 9=G#, 10=A, 11=A#, 12=B, 13=imaginary
-    # Black keys: 1, 3, 7, 9, 11
-    black_keys = {1, 3, 7, 9, 11}
-    return 'black' if p in black_keys else 'white'
+def pitch_to_key_color(pitch: int) -> int:
+    """Determine if pitch is a white (WHITE_KEY) or black (BLACK_KEY) key."""
+    return (BLACK_MASK >> (pitch % 14)) & 1
 
 def rule_1_2_13_score(distance: int, f1: int, f2: int, is_right: bool) -> float:
     """
@@ -140,42 +174,46 @@ def rule_1_2_13_score(distance: int, f1: int, f2: int, is_right: bool) -> float:
 
     Returns total penalty from all three rules.
     """
-    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = get_distance_limits(f1, f2, is_right)
-
-    score = 0.0
+    # Left-hand limits are the mirrored right-hand ones, so mirror the distance
+    # instead and read the right-hand table directly.
+    if not is_right:
+        distance = -distance
+    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = DIST_LIMITS[f1][f2]
 
     # Check violations from outer to inner ranges (cascading)
     if distance < min_rel:
-        score += (min_rel - distance)  # Rule 2: +1 per unit
+        score = min_rel - distance  # Rule 2: +1 per unit
         if distance < min_comf:
             score += 2 * (min_comf - distance)  # Rule 1: +2 per unit ADDITIONAL
             if distance < min_prac:
                 score += 10 * (min_prac - distance)  # Rule 13: +10 per unit ADDITIONAL
-    elif distance > max_rel:
-        score += (distance - max_rel)  # Rule 2: +1 per unit
+        return float(score)
+    if distance > max_rel:
+        score = distance - max_rel  # Rule 2: +1 per unit
         if distance > max_comf:
             score += 2 * (distance - max_comf)  # Rule 1: +2 per unit ADDITIONAL
             if distance > max_prac:
                 score += 10 * (distance - max_prac)  # Rule 13: +10 per unit ADDITIONAL
-
-    return score
+        return float(score)
+    return 0.0
 
 def rule_5_score(finger: int) -> float:
     """Rule 5: Penalty for fourth finger usage (+1)."""
     return 1.0 if finger == 4 else 0.0
 
+FINGERS_3_4_MASK = (1 << 3) | (1 << 4)
+
 def rule_6_score(f1: int, f2: int) -> float:
     """Rule 6: Penalty for 3-4 finger combination (+1)."""
-    if {f1, f2} == {3, 4}:
-        return 1.0
-    return 0.0
+    # Compare finger sets as bitmasks rather than building two sets
+    return 1.0 if ((1 << f1) | (1 << f2)) == FINGERS_3_4_MASK else 0.0
 
 def rule_7_score(f1: int, f2: int, p1: int, p2: int) -> float:
     """Rule 7: Penalty for finger 3 on white and finger 4 on black (+1)."""
     c1, c2 = pitch_to_key_color(p1), pitch_to_key_color(p2)
     
-    if (f1 == 3 and c1 == 'white' and f2 == 4 and c2 == 'black') or \
-       (f1 == 4 and c1 == 'black' and f2 == 3 and c2 == 'white'):
+    if (f1 == 3 and c1 == WHITE_KEY and f2 == 4 and c2 == BLACK_KEY) or \
+       (f1 == 4 and c1 == BLACK_KEY and f2 == 3 and c2 == WHITE_KEY):
         return 1.0
     return 0.0
 
@@ -184,15 +222,15 @@ def rule_8_score(f_prev: Optional[int], f_curr: int, f_next: Optional[int],
     """Rule 8: Penalty for thumb on black key (+0.5, +1 for white before, +1 for white after)."""
     if f_curr != 1:
         return 0.0
-    if pitch_to_key_color(p_curr) != 'black':
+    if pitch_to_key_color(p_curr) != BLACK_KEY:
         return 0.0
     
     score = 0.5
     if f_prev is not None and f_prev != 1 and p_prev is not None:
-        if pitch_to_key_color(p_prev) == 'white':
+        if pitch_to_key_color(p_prev) == WHITE_KEY:
             score += 1.0
     if f_next is not None and f_next != 1 and p_next is not None:
-        if pitch_to_key_color(p_next) == 'white':
+        if pitch_to_key_color(p_next) == WHITE_KEY:
             score += 1.0
     return score
 
@@ -201,18 +239,37 @@ def rule_9_score(f_prev: Optional[int], f_curr: int, f_next: Optional[int],
     """Rule 9: Penalty for fifth finger on black key (+1 for white before, +1 for white after)."""
     if f_curr != 5:
         return 0.0
-    if pitch_to_key_color(p_curr) != 'black':
+    if pitch_to_key_color(p_curr) != BLACK_KEY:
         return 0.0
     
     score = 0.0
     if f_prev is not None and f_prev != 5 and p_prev is not None:
-        if pitch_to_key_color(p_prev) == 'white':
+        if pitch_to_key_color(p_prev) == WHITE_KEY:
             score += 1.0
     if f_next is not None and f_next != 5 and p_next is not None:
-        if pitch_to_key_color(p_next) == 'white':
+        if pitch_to_key_color(p_next) == WHITE_KEY:
             score += 1.0
     return score
 
+def _build_rule_8_9_table() -> Tuple[float, ...]:
+    """
+    Rules 8 + 9 for every (f_prev, f_curr, f_next, c_prev, c_curr, c_next),
+    flattened as ((((f_prev*6 + f_curr)*6 + f_next)*2 + c_prev)*2 + c_curr)*2 + c_next.
+    Finger 0 stands for a missing neighbouring note.
+    """
+    color_pitch = (0, 1)  # a white key (C) and a black key (C#)
+    table = []
+    for f_prev, f_curr, f_next in product(range(6), repeat=3):
+        for c_prev, c_curr, c_next in product((WHITE_KEY, BLACK_KEY), repeat=3):
+            args = (f_prev or None, f_curr, f_next or None,
+                    color_pitch[c_prev] if f_prev else None,
+                    color_pitch[c_curr],
+                    color_pitch[c_next] if f_next else None)
+            table.append(rule_8_score(*args) + rule_9_score(*args))
+    return tuple(table)
+
+RULE_8_9_TABLE = _build_rule_8_9_table()
+
 def rule_10_score(f1: int, f2: int, p1: int, p2: int) -> float:
     """Rule 10: Penalty for thumb crossing on same level (white-white or black-black) (+1)."""
     if f1 != 1 and f2 != 1:
@@ -227,8 +284,8 @@ def rule_11_score(f1: int, f2: int, p1: int, p2: int) -> float:
     """Rule 11: Penalty for thumb on black crossed by finger on white (+2)."""
     c1, c2 = pitch_to_key_color(p1), pitch_to_key_color(p2)
     
-    if (f1 == 1 and c1 == 'black' and f2 != 1 and c2 == 'white') or \
-       (f2 == 1 and c2 == 'black' and f1 != 1 and c1 == 'white'):
+    if (f1 == 1 and c1 == BLACK_KEY and f2 != 1 and c2 == WHITE_KEY) or \
+       (f2 == 1 and c2 == BLACK_KEY and f1 != 1 and c1 == WHITE_KEY):
         return 2.0
     return 0.0
 
@@ -246,16 +303,32 @@ def rule_12_score(f1: int, f2: int, f3: int, p1: int, p2: int, p3: int) -> float
         return 1.0
     return 0.0
 
-def rule_15_score(prev_pitches: Tuple[int, ...], curr_pitches: Tuple[int, ...],
-                   prev_fingers: Tuple[int, ...], curr_fingers: Tuple[int, ...]) -> float:
-    """Rule 15: Penalty for same pitch played by different finger (+1 per occurrence)."""
+def rule_15_score(prev_pitches: Sequence[int], curr_pitches: Sequence[int],
+                   prev_fingers: Sequence[int], curr_fingers: Sequence[int]) -> float:
+    """
+    Rule 15: Penalty for same pitch played by different finger (+1 per occurrence).
+    Pitches must be sorted ascending; the shared pitches are found with a
+    two-pointer merge instead of building dicts and sets.
+    """
     score = 0.0
-    prev_dict = dict(zip(prev_pitches, prev_fingers))
-    curr_dict = dict(zip(curr_pitches, curr_fingers))
-    
-    for pitch in set(prev_pitches) & set(curr_pitches):
-        if prev_dict[pitch] != curr_dict[pitch]:
-            score += 1.0
+    i = j = 0
+    n_prev, n_curr = len(prev_pitches), len(curr_pitches)
+    while i < n_prev and j < n_curr:
+        p, q = prev_pitches[i], curr_pitches[j]
+        if p < q:
+            i += 1
+        elif p > q:
+            j += 1
+        else:
+            # A repeated pitch counts once, with the finger of its last note
+            while i + 1 < n_prev and prev_pitches[i + 1] == p:
+                i += 1
+            while j + 1 < n_curr and curr_pitches[j + 1] == p:
+                j += 1
+            if prev_fingers[i] != curr_fingers[j]:
+                score += 1.0
+            i += 1
+            j += 1
     return score
 
 # =============================================================================
@@ -272,7 +345,7 @@ def rule_3_score(f1: int, f2: int, f3: int, p1: int, p2: int, p3: int, is_right:
     score = 0.0
     distance_1_3 = p3 - p1
     
-    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = get_distance_limits(f1, f3, is_right)
+    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = HAND_DIST_LIMITS[f1][f3][is_right]
     
     # First condition: outside comfort range
     if distance_1_3 < min_comf or distance_1_3 > max_comf:
@@ -293,7 +366,7 @@ def rule_3_score(f1: int, f2: int, f3: int, p1: int, p2: int, p3: int, is_right:
 def rule_4_score(f1: int, f3: int, p1: int, p3: int, is_right: bool) -> float:
     """Rule 4: Penalty per unit outside comfort range for triplet distance."""
     distance = p3 - p1
-    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = get_distance_limits(f1, f3, is_right)
+    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = HAND_DIST_LIMITS[f1][f3][is_right]
     
     score = 0.0
     if distance < min_comf:
@@ -306,14 +379,20 @@ def rule_4_score(f1: int, f3: int, p1: int, p3: int, is_right: bool) -> float:
 # Chord Cost (Rule 14)
 # =============================================================================
 
-def rule_14_score(pitches: List[int], fingers: List[int], is_right: bool) -> float:
+def rule_14_score(pitches: Sequence[int], fingers: Sequence[int], is_right: bool) -> float:
     """
     Rule 14: Apply rules 1, 2 (doubled), and 13 within a chord.
     Uses cascading penalties matching C++ reference implementation.
     """
     if len(pitches) <= 1:
         return 0.0
+    # Only distances matter, so transposed chord shapes share a cache slot
+    base = min(pitches)
+    return _rule_14_cached(tuple(p - base for p in pitches), tuple(fingers), is_right)
 
+@lru_cache(maxsize=4096)
+def _rule_14_cached(pitches: Tuple[int, ...], fingers: Tuple[int, ...], is_right: bool) -> float:
+    """Memoised body of rule_14_score for normalised chord shapes."""
     score = 0.0
     # Check all pairs within the chord
     for i in range(len(pitches)):
@@ -322,7 +401,7 @@ def rule_14_score(pitches: List[int], fingers: List[int], is_right: bool) -> flo
             f1, f2 = fingers[i], fingers[j]
             distance = p2 - p1
 
-            min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = get_distance_limits(f1, f2, is_right)
+            min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = HAND_DIST_LIMITS[f1][f2][is_right]
 
             # Cascading penalties with doubled weights for Rule 2 and Rule 1
             if distance < min_rel:
@@ -344,16 +423,44 @@ def rule_14_score(pitches: List[int], fingers: List[int], is_right: bool) -> flo
 # State Representation and Transition Costs
 # =============================================================================
 
-def generate_valid_fingerings(num_notes: int) -> List[Tuple[int, ...]]:
-    """Generate all valid finger assignments for a chord of given size."""
-    if num_notes == 0:
-        return [()]
+# Valid fingerings for every possible slice size, indexed by note count:
+# all permutations of k fingers from {1,2,3,4,5}, enumerated once at import
+_FINGERINGS = tuple(tuple(permutations((1, 2, 3, 4, 5), k)) for k in range(6))
+
+def generate_valid_fingerings(num_notes: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    All valid finger assignments for a chord of given size.
+    They come from the table built at import and are shared between slices,
+    so they are returned as an immutable tuple of tuples.
+    """
     if num_notes > 5:
         raise ValueError("Cannot have more than 5 notes per hand")
-    
-    # All permutations of num_notes fingers from {1,2,3,4,5}
-    all_fingers = [1, 2, 3, 4, 5]
-    return list(permutations(all_fingers, num_notes))
+    if num_notes < 0:
+        raise ValueError("Number of notes cannot be negative")
+    return _FINGERINGS[num_notes]
+
+def _admissible_mask(num_notes: int, is_right: bool) -> int:
+    """
+    Bitmask over the fingering ids of a num_notes chord: bit k is set when
+    _FINGERINGS[num_notes][k] runs in hand order over the sorted pitches
+    (finger numbers rising for the right hand, falling for the left).
+    """
+    mask = 0
+    for fid, fingers in enumerate(_FINGERINGS[num_notes]):
+        steps = [f2 - f1 for f1, f2 in zip(fingers, fingers[1:])]
+        if all(step > 0 for step in steps) if is_right else all(step < 0 for step in steps):
+            mask |= 1 << fid
+    return mask
+
+# ADMISSIBLE_MASKS[num_notes][is_right]
+ADMISSIBLE_MASKS = tuple((_admissible_mask(k, False), _admissible_mask(k, True)) for k in range(6))
+
+def lookup_slice_fingerings(slice_pitches: Sequence[Sequence[int]]) -> List[Tuple[Tuple[int, ...], ...]]:
+    """Valid fingerings of each slice, taken from the precomputed table."""
+    try:
+        return [_FINGERINGS[len(pitches)] for pitches in slice_pitches]
+    except IndexError:
+        raise ValueError("Cannot have more than 5 notes per hand") from None
 
 def compute_inter_slice_cost(
     prev_pitches: List[int], prev_fingers: Tuple[int, ...],
@@ -365,15 +472,31 @@ def compute_inter_slice_cost(
     Applies rules 1, 2, 5-11, 13, 15 for monophonic passages.
     Applies rules 1, 2, 13, 15 for polyphonic passages.
     """
-    score = 0.0
-
-    # For each note transition
-    for i, (p1, f1) in enumerate(zip(prev_pitches, prev_fingers)):
-        for j, (p2, f2) in enumerate(zip(curr_pitches, curr_fingers)):
+    # Rules 1, 2, 13 with cascading penalties for every note transition.
+    # This is rule_1_2_13_score inlined over the prev x curr cross product:
+    # mirror the pitches once for the left hand and walk the limit table rows.
+    sign = 1 if is_right else -1
+    curr_notes = [(sign * p2, f2) for p2, f2 in zip(curr_pitches, curr_fingers)]
+    score = 0
+    for p1, f1 in zip(prev_pitches, prev_fingers):
+        p1 *= sign
+        limits_row = DIST_LIMITS[f1]
+        for p2, f2 in curr_notes:
             distance = p2 - p1
-
-            # Rules 1, 2, 13 with cascading penalties
-            score += rule_1_2_13_score(distance, f1, f2, is_right)
+            min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = limits_row[f2]
+            if distance < min_rel:
+                score += min_rel - distance
+                if distance < min_comf:
+                    score += 2 * (min_comf - distance)
+                    if distance < min_prac:
+                        score += 10 * (min_prac - distance)
+            elif distance > max_rel:
+                score += distance - max_rel
+                if distance > max_comf:
+                    score += 2 * (distance - max_comf)
+                    if distance > max_prac:
+                        score += 10 * (distance - max_prac)
+    score = float(score)
     
     # Monophonic-specific rules (only if both slices have single notes)
     if is_monophonic and len(prev_pitches) == 1 and len(curr_pitches) == 1:
@@ -396,23 +519,157 @@ def compute_inter_slice_cost(
         score += rule_11_score(f1, f2, p1, p2)
     
     # Rule 15: Same pitch, different finger
-    score += rule_15_score(
-        tuple(prev_pitches), tuple(curr_pitches),
-        prev_fingers, curr_fingers
-    )
+    score += rule_15_score(prev_pitches, curr_pitches, prev_fingers, curr_fingers)
     
     return score
 
 def compute_intra_slice_cost(pitches: List[int], fingers: Tuple[int, ...], is_right: bool) -> float:
     """Compute cost within a single chord (Rule 14)."""
-    return rule_14_score(pitches, list(fingers), is_right)
+    return rule_14_score(pitches, fingers, is_right)
+
+def _specialize_mono_cost(f1: int, f2: int, is_right: bool) -> Callable[[int, int], float]:
+    """
+    Partially evaluate compute_inter_slice_cost for two single notes with a
+    fixed finger pair and hand. The finger-only rules (5, 6) and the key colour
+    rules (7, 10, 11) fold into a table over the two key colours, leaving the
+    rule 1/2/13 cascade and rule 15 to run per call.
+    """
+    sign = 1 if is_right else -1
+    min_prac, min_comf, min_rel, max_rel, max_comf, max_prac = DIST_LIMITS[f1][f2]
+    # color_cost[c1 * 2 + c2]; pitches 0 and 1 are a white and a black key
+    color_cost = tuple(
+        rule_5_score(f2) + rule_6_score(f1, f2) + rule_7_score(f1, f2, c1, c2)
+        + rule_10_score(f1, f2, c1, c2) + rule_11_score(f1, f2, c1, c2)
+        for c1 in (WHITE_KEY, BLACK_KEY) for c2 in (WHITE_KEY, BLACK_KEY)
+    )
+    same_pitch_cost = rule_15_score((0,), (0,), (f1,), (f2,))
+    
+    def mono_cost(p1: int, p2: int) -> float:
+        score = color_cost[pitch_to_key_color(p1) * 2 + pitch_to_key_color(p2)]
+        distance = sign * (p2 - p1)
+        if distance < min_rel:
+            score += min_rel - distance
+            if distance < min_comf:
+                score += 2 * (min_comf - distance)
+                if distance < min_prac:
+                    score += 10 * (min_prac - distance)
+        elif distance > max_rel:
+            score += distance - max_rel
+            if distance > max_comf:
+                score += 2 * (distance - max_comf)
+                if distance > max_prac:
+                    score += 10 * (distance - max_prac)
+        if p1 == p2:
+            score += same_pitch_cost
+        return score
+    
+    return mono_cost
+
+# MONO_COST_R/L[f1 - 1][f2 - 1](p1, p2): specialised single-note transition
+# costs, equal to compute_inter_slice_cost([p1], (f1,), [p2], (f2,), is_right, True)
+MONO_COST_R = tuple(tuple(_specialize_mono_cost(f1, f2, True) for f2 in range(1, 6))
+                    for f1 in range(1, 6))
+MONO_COST_L = tuple(tuple(_specialize_mono_cost(f1, f2, False) for f2 in range(1, 6))
+                    for f1 in range(1, 6))
+
+def slice_transition_cost(
+    prev_pitches: Sequence[int], prev_fingers: Tuple[int, ...],
+    curr_pitches: Sequence[int], curr_fingers: Tuple[int, ...],
+    is_right: bool
+) -> float:
+    """
+    Cost of moving from one slice to the next plus the chord cost of the new
+    slice (compute_inter_slice_cost + compute_intra_slice_cost) in one call.
+    Two single notes go straight to the specialised MONO_COST kernels.
+    """
+    if len(prev_pitches) == 1 and len(curr_pitches) == 1:
+        mono_cost = MONO_COST_R if is_right else MONO_COST_L
+        return mono_cost[prev_fingers[0] - 1][curr_fingers[0] - 1](prev_pitches[0], curr_pitches[0])
+    return (compute_inter_slice_cost(prev_pitches, prev_fingers, curr_pitches, curr_fingers,
+                                     is_right, False)
+            + rule_14_score(curr_pitches, curr_fingers, is_right))
+
+@lru_cache(maxsize=1024)
+def _slice_transition_matrix(prev_shape: Tuple[int, ...], curr_shape: Tuple[int, ...],
+                             origin: int, is_right: bool) -> Tuple[float, ...]:
+    """Cached body of slice_transition_matrix, keyed on what the rules depend on."""
+    prev_pitches = [origin + d for d in prev_shape]
+    curr_pitches = [origin + d for d in curr_shape]
+    return tuple(
+        slice_transition_cost(prev_pitches, prev_fingers, curr_pitches, curr_fingers, is_right)
+        for curr_fingers in _FINGERINGS[len(curr_shape)]
+        for prev_fingers in _FINGERINGS[len(prev_shape)]
+    )
+
+def slice_transition_matrix(prev_pitches: Sequence[int], curr_pitches: Sequence[int],
+                            is_right: bool) -> Tuple[float, ...]:
+    """
+    slice_transition_cost for every fingering pair of two slices, flattened
+    curr-major: the entry for fingering ids (prev, curr) is at
+    curr * n_prev + prev. Between chords only the distances matter, and key
+    colours only add the pitch class when both slices are single notes, so
+    matrices are shared between repeated and transposed slice pairs.
+    """
+    base = prev_pitches[0]
+    origin = base % 14 if len(prev_pitches) == 1 and len(curr_pitches) == 1 else 0
+    return _slice_transition_matrix(tuple(p - base for p in prev_pitches),
+                                    tuple(p - base for p in curr_pitches),
+                                    origin, is_right)
+
+@lru_cache(maxsize=1024)
+def _mono_transition_matrix(pitch_class: int, distance: int, is_right: bool) -> Tuple[Tuple[float, ...], ...]:
+    """Cached body of mono_transition_matrix, keyed on what the rules depend on."""
+    p1, p2 = pitch_class, pitch_class + distance
+    mono_cost = MONO_COST_R if is_right else MONO_COST_L
+    return tuple(tuple(cost(p1, p2) for cost in row) for row in mono_cost)
+
+def mono_transition_matrix(p1: int, p2: int, is_right: bool) -> Tuple[Tuple[float, ...], ...]:
+    """
+    Transition costs between two single-note slices as a 5x5 matrix
+    T[f1 - 1][f2 - 1]. Key colours only depend on the pitch class and the
+    distance, so matrices are shared between transposed intervals.
+    """
+    return _mono_transition_matrix(p1 % 14, p2 - p1, is_right)
+
+@lru_cache(maxsize=1024)
+def _mono_triplet_tensor(pitch_class: int, d12: int, d13: int,
+                         is_right: bool) -> Tuple[Tuple[Tuple[float, ...], ...], ...]:
+    """Cached body of mono_triplet_tensor, keyed on what the rules depend on."""
+    p1, p2, p3 = pitch_class, pitch_class + d12, pitch_class + d13
+    c1, c2, c3 = pitch_to_key_color(p1), pitch_to_key_color(p2), pitch_to_key_color(p3)
+    return tuple(
+        tuple(
+            tuple(
+                rule_3_score(f1, f2, f3, p1, p2, p3, is_right)
+                + rule_4_score(f1, f3, p1, p3, is_right)
+                + rule_12_score(f1, f2, f3, p1, p2, p3)
+                + RULE_8_9_TABLE[((((f1 * 6 + f2) * 6 + f3) * 2 + c1) * 2 + c2) * 2 + c3]
+                for f3 in range(1, 6)
+            )
+            for f2 in range(1, 6)
+        )
+        for f1 in range(1, 6)
+    )
+
+def mono_triplet_tensor(p1: int, p2: int, p3: int,
+                        is_right: bool) -> Tuple[Tuple[Tuple[float, ...], ...], ...]:
+    """
+    Triplet costs of three consecutive single notes as a 5x5x5 tensor
+    X[f1 - 1][f2 - 1][f3 - 1]: rules 3, 4, 12 plus rules 8, 9 on the middle
+    note. Shared between transpositions by octave, like mono_transition_matrix.
+    """
+    return _mono_triplet_tensor(p1 % 14, p2 - p1, p3 - p1, is_right)
 
 # =============================================================================
 # Dynamic Programming Solver
 # =============================================================================
 
 class FingeringSolver:
-    """Solves piano fingering using exact dynamic programming."""
+    """
+    Solves piano fingering using exact dynamic programming.
+    Returns a single optimal fingering; see FingeringSolverWithTriplets for
+    enumerating all of them.
+    """
     
     def __init__(self, hand: Hand):
         self.hand = hand
@@ -428,87 +685,100 @@ class FingeringSolver:
             return 0.0, []
         
         # Get pitches for each slice
-        slice_pitches = []
-        for s in self.hand.slices:
-            pitches = sorted([n.absolute_pitch for n in s.notes])
-            slice_pitches.append(pitches)
+        slice_pitches = self.hand.slice_pitches()
+        
+        # Valid fingerings for each slice
+        slice_fingerings = lookup_slice_fingerings(slice_pitches)
+        
+        # DP over dense cost lists. Fingerings are identified by their index
+        # in slice_fingerings[i]. The state of slice i is its fingering id,
+        # except when slices i-1 and i are both single notes: then it is the
+        # pair of fingering ids packed as prev * 5 + curr, which carries the
+        # history needed by the triplet rules (3, 4, 12) and rules 8, 9.
+        pair_state = [False] + [
+            len(slice_pitches[i-1]) == 1 and len(slice_pitches[i]) == 1
+            for i in range(1, self.n_slices)
+        ]
         
-        # Generate valid fingerings for each slice
-        slice_fingerings = []
-        for pitches in slice_pitches:
-            fingerings = generate_valid_fingerings(len(pitches))
-            slice_fingerings.append(fingerings)
+        n_states = [25 if pair_state[i] else len(slice_fingerings[i])
+                    for i in range(self.n_slices)]
         
-        # DP: dp[state] = (min_cost, backtrack_info)
-        # State is the fingering tuple
+        # Two cost buffers sized for the largest slice, swapped every slice
+        # so the DP itself allocates no per-state objects
+        max_states = max(n_states)
+        dp_prev = [0.0] * max_states
+        dp_curr = [0.0] * max_states
         
         # Initialize first slice
-        dp_prev: Dict[Tuple[int, ...], Tuple[float, None]] = {}
-        for fingers in slice_fingerings[0]:
-            cost = compute_intra_slice_cost(slice_pitches[0], fingers, self.is_right)
-            # Add rule 5 for first note in monophonic
+        for k, fingers in enumerate(slice_fingerings[0]):
+            dp_prev[k] = compute_intra_slice_cost(slice_pitches[0], fingers, self.is_right)
             if len(slice_pitches[0]) == 1:
-                cost += rule_5_score(fingers[0])
-            dp_prev[fingers] = (cost, None)
+                # Add rule 5 for first note in monophonic
+                dp_prev[k] += rule_5_score(fingers[0])
         
         # Process remaining slices
-        backtrack = [{}]  # backtrack[i][state] = previous_state
+        # backtrack[i][state] = previous state, as int16 (states < 32768)
+        backtrack: List[array] = [array('h')]
         
         for i in range(1, self.n_slices):
-            dp_curr: Dict[Tuple[int, ...], Tuple[float, Tuple[int, ...]]] = {}
-            backtrack.append({})
+            bt_curr = array('h', [0]) * n_states[i]
             
-            is_mono = (len(slice_pitches[i-1]) == 1 and len(slice_pitches[i]) == 1)
-            
-            for curr_fingers in slice_fingerings[i]:
-                best_cost = float('inf')
-                best_prev = None
-                
-                for prev_fingers, (prev_cost, _) in dp_prev.items():
-                    # Transition cost
-                    trans_cost = compute_inter_slice_cost(
-                        slice_pitches[i-1], prev_fingers,
-                        slice_pitches[i], curr_fingers,
-                        self.is_right, is_mono
-                    )
-                    
-                    # Intra-slice cost
-                    intra_cost = compute_intra_slice_cost(
-                        slice_pitches[i], curr_fingers, self.is_right
-                    )
-                    
-                    # Triplet costs (rules 3, 4, 12) if we have enough history
-                    triplet_cost = 0.0
-                    if i >= 2 and is_mono and len(slice_pitches[i-2]) == 1:
-                        # We need to find the best path to prev_fingers
-                        # This is tricky - we need to consider the state before prev
-                        # For exact DP, we'd need to expand state space
-                        pass  # Simplified: skip triplet rules for now
-                    
-                    total_cost = prev_cost + trans_cost + intra_cost + triplet_cost
-                    
-                    if total_cost < best_cost:
-                        best_cost = total_cost
-                        best_prev = prev_fingers
-                
-                dp_curr[curr_fingers] = (best_cost, best_prev)
-                backtrack[i][curr_fingers] = best_prev
+            if pair_state[i]:
+                # Two single notes: fid == finger - 1, no intra-slice cost
+                T = mono_transition_matrix(slice_pitches[i-1][0], slice_pitches[i][0], self.is_right)
+                if pair_state[i-1]:
+                    # Three single notes: minimise over the note before last
+                    X = mono_triplet_tensor(slice_pitches[i-2][0], slice_pitches[i-1][0],
+                                            slice_pitches[i][0], self.is_right)
+                    for b in range(5):
+                        for c in range(5):
+                            totals = [dp_prev[a * 5 + b] + X[a][b][c] for a in range(5)]
+                            # First minimum wins, so ties keep the earliest predecessor
+                            best_a = min(range(5), key=totals.__getitem__)
+                            dp_curr[b * 5 + c] = totals[best_a] + T[b][c]
+                            bt_curr[b * 5 + c] = best_a * 5 + b
+                else:
+                    # Run of single notes starts at i-1; rules 8, 9 see no
+                    # previous note (and are not applied to the first slice)
+                    if i >= 2:
+                        c_curr = pitch_to_key_color(slice_pitches[i-1][0])
+                        c_next = pitch_to_key_color(slice_pitches[i][0])
+                    for b in range(5):
+                        for c in range(5):
+                            cost = dp_prev[b] + T[b][c]
+                            if i >= 2:
+                                cost += RULE_8_9_TABLE[(((b + 1) * 6 + c + 1) * 4 + c_curr) * 2 + c_next]
+                            dp_curr[b * 5 + c] = cost
+                            bt_curr[b * 5 + c] = b
+            else:
+                n_prev = len(slice_fingerings[i-1])
+                trans_matrix = slice_transition_matrix(slice_pitches[i-1], slice_pitches[i],
+                                                       self.is_right)
+                for k in range(len(slice_fingerings[i])):
+                    # Transition plus chord cost of this fingering, per predecessor
+                    trans = trans_matrix[k * n_prev:(k + 1) * n_prev]
+                    if pair_state[i-1]:
+                        # Leaving a run of single notes: collapse the pair state
+                        totals = [dp_prev[j] + trans[j % 5] for j in range(25)]
+                    else:
+                        totals = [prev_cost + t for prev_cost, t in zip(dp_prev, trans)]
+                    best_prev = min(range(len(totals)), key=totals.__getitem__)
+                    dp_curr[k] = totals[best_prev]
+                    bt_curr[k] = best_prev
             
-            dp_prev = dp_curr
+            dp_prev, dp_curr = dp_curr, dp_prev
+            backtrack.append(bt_curr)
         
         # Find best final state
-        best_final_cost = float('inf')
-        best_final_state = None
-        for state, (cost, _) in dp_prev.items():
-            if cost < best_final_cost:
-                best_final_cost = cost
-                best_final_state = state
+        best_state = min(range(n_states[-1]), key=dp_prev.__getitem__)
+        best_final_cost = dp_prev[best_state]
         
         # Backtrack to get solution
         solution = []
-        state = best_final_state
+        state = best_state
         for i in range(self.n_slices - 1, -1, -1):
-            solution.append(state)
+            fid = state % 5 if pair_state[i] else state
+            solution.append(slice_fingerings[i][fid])
             if i > 0:
                 state = backtrack[i][state]
         solution.reverse()
@@ -519,46 +789,235 @@ class FingeringSolver:
 # Extended DP with Triplet Support
 # =============================================================================
 
+def _backtrack_paths(
+    backtrack: List[List[List[int]]], final_states: List[int],
+    slice_fingerings: List[Tuple[Tuple[int, ...], ...]],
+    max_solutions: Optional[int] = None
+) -> List[List[Tuple[int, ...]]]:
+    """
+    Enumerate the optimal paths of the triplet DP, depth first, stopping
+    after max_solutions paths when it is given.
+    
+    backtrack[i][curr * n_prev + prev] lists the slice i-2 fingering ids on
+    optimal paths into state (prev, curr) of slice i, and final_states are
+    the optimal states of the last slice in the same encoding. Final states
+    and the predecessor ids of every state are distinct, so each path is
+    produced exactly once. The DFS runs on an explicit stack and records
+    the fingering ids of the current path in a single shared buffer.
+    """
+    n_slices = len(slice_fingerings)
+    n_last_prev = len(slice_fingerings[-2])
+    path_ids = [0] * n_slices
+    solutions = []
+    
+    # Pushed in reverse so that paths pop in the order of recursive DFS
+    stack = []
+    for final_state in reversed(final_states):
+        curr_id, prev_id = divmod(final_state, n_last_prev)
+        stack.append((n_slices - 1, prev_id, curr_id))
+    
+    while stack:
+        slice_idx, prev_id, curr_id = stack.pop()
+        path_ids[slice_idx] = curr_id
+        if slice_idx == 1:
+            # At the beginning - state is (f0, f1)
+            path_ids[0] = prev_id
+            solutions.append([fingerings[k] for fingerings, k in zip(slice_fingerings, path_ids)])
+            if len(solutions) == max_solutions:
+                break
+            continue
+        
+        n_prev = len(slice_fingerings[slice_idx - 1])
+        for pp_id in reversed(backtrack[slice_idx][curr_id * n_prev + prev_id]):
+            stack.append((slice_idx - 1, pp_id, prev_id))
+    
+    return solutions
+
+def _count_paths(backtrack: List[List[List[int]]], final_states: List[int],
+                 n_fingerings: List[int]) -> int:
+    """
+    Number of optimal paths of the triplet DP, counted forward over the
+    same tables _backtrack_paths walks, without enumerating them.
+    """
+    # Every state of slice 1 starts exactly one path
+    counts = [1] * (n_fingerings[0] * n_fingerings[1])
+    for i in range(2, len(n_fingerings)):
+        n_pp, n_p = n_fingerings[i-2], n_fingerings[i-1]
+        counts = [
+            sum(counts[(state % n_p) * n_pp + pp_id] for pp_id in prev_ids)
+            for state, prev_ids in enumerate(backtrack[i])
+        ]
+    return sum(counts[state] for state in final_states)
+
 class FingeringSolverWithTriplets:
     """
     Solves piano fingering using DP with expanded state to handle triplet rules.
     State includes current and previous fingering for triplet rule evaluation.
     Tracks all optimal solutions with the same minimum score.
+    
+    With strict_admissible, chords are only fingered in hand order (see
+    ADMISSIBLE_MASKS), which skips crossed chord fingerings instead of
+    scoring them. This is a restriction of the search space, so scores can
+    differ from the default, which keeps every fingering.
+    
+    An optional upper_bound on the optimal score (e.g. the score of any
+    complete fingering, or FingeringSolver's optimum) enables branch and
+    bound: states that are strictly worse than the bound allows are
+    dropped, so the optimal solutions are unchanged. solve() raises
+    ValueError if the bound is below the optimal score.
+    
+    Ties can grow exponentially with the length of a piece, so
+    max_solutions caps how many optimal fingerings solve() returns.
+    num_solutions always holds the exact number of optimal fingerings.
     """
     
-    def __init__(self, hand: Hand):
+    def __init__(self, hand: Hand, upper_bound: Optional[float] = None,
+                 strict_admissible: bool = False, max_solutions: Optional[int] = None):
         self.hand = hand
         self.is_right = hand.is_right
         self.n_slices = len(hand.slices)
+        self.upper_bound = upper_bound
+        self.strict_admissible = strict_admissible
+        self.max_solutions = max_solutions
+        self.num_solutions = 0
+        
+    def _prune(self, costs: List[float], rest_lower_bound: float) -> None:
+        """Drop states that cannot lie on a path within the upper bound."""
+        limit = self.upper_bound - rest_lower_bound
+        for k, cost in enumerate(costs):
+            if cost > limit:
+                costs[k] = float('inf')
+    
+    @staticmethod
+    def _drop_inadmissible(costs: List[float], mask: int, n_prev: int) -> None:
+        """Make states whose curr fingering id is not in mask unreachable."""
+        for curr_id in range(len(costs) // n_prev):
+            if not (mask >> curr_id) & 1:
+                costs[curr_id * n_prev:(curr_id + 1) * n_prev] = [float('inf')] * n_prev
+    
+    def _solve_mono(self, pitches: List[int]) -> Tuple[float, List[List[Tuple[int, ...]]]]:
+        """
+        Triplet DP specialised for hands made only of single notes.
+        
+        The state (f_prev, f_curr) is a pair of fingers, so each step is a
+        5x5 table relaxed with the transition matrix T and the triplet
+        tensor X. Produces the same solutions, in the same order, as the
+        generic path.
+        """
+        n = len(pitches)
+        is_right = self.is_right
+        fingers = range(5)
+        
+        trans = [None] + [mono_transition_matrix(pitches[i-1], pitches[i], is_right)
+                          for i in range(1, n)]
+        
+        # Branch and bound, as in solve()
+        if self.upper_bound is not None:
+            rest_lower_bound = [0.0] * n
+            for i in range(n - 2, -1, -1):
+                rest_lower_bound[i] = rest_lower_bound[i+1] + min(map(min, trans[i+1]))
+        
+        # State (a, b) of note i lives at cost[b * 5 + a], fingers are 0-based
+        T = trans[1]
+        start = [
+            compute_intra_slice_cost(pitches[:1], (a + 1,), is_right) + rule_5_score(a + 1)
+            for a in fingers
+        ]
+        cost_prev = [start[a] + T[a][b] for b in fingers for a in fingers]
+        if self.upper_bound is not None:
+            self._prune(cost_prev, rest_lower_bound[1])
+        
+        # backtrack[i][c * 5 + b] = fingers of note i-2 on optimal paths into (b, c)
+        backtrack: List[List[List[int]]] = [[], []]
         
+        for i in range(2, n):
+            T = trans[i]
+            X = mono_triplet_tensor(pitches[i-2], pitches[i-1], pitches[i], is_right)
+            cost_curr = [0.0] * 25
+            bt_curr: List[List[int]] = [[]] * 25
+            
+            for c in fingers:
+                for b in fingers:
+                    trans_cost = T[b][c]
+                    bucket = b * 5
+                    best_cost = float('inf')
+                    best_prev = []
+                    for a in fingers:
+                        total_cost = cost_prev[bucket + a] + trans_cost + X[a][b][c]
+                        if total_cost < best_cost:
+                            best_cost = total_cost
+                            best_prev = [a]
+                        elif total_cost == best_cost:
+                            best_prev.append(a)
+                    cost_curr[c * 5 + b] = best_cost
+                    bt_curr[c * 5 + b] = best_prev
+            
+            if self.upper_bound is not None:
+                self._prune(cost_curr, rest_lower_bound[i])
+            
+            cost_prev = cost_curr
+            backtrack.append(bt_curr)
+        
+        best_final_cost = min(cost_prev)
+        if best_final_cost == float('inf'):
+            raise ValueError("upper_bound is below the optimal score")
+        
+        best_final_states = [k for k, cost in enumerate(cost_prev) if cost == best_final_cost]
+        self.num_solutions = _count_paths(backtrack, best_final_states, [5] * n)
+        all_solutions = _backtrack_paths(backtrack, best_final_states, [_FINGERINGS[1]] * n,
+                                         self.max_solutions)
+        
+        return best_final_cost, all_solutions
+    
     def solve(self) -> Tuple[float, List[List[Tuple[int, ...]]]]:
         """
         Find optimal fingering(s) with full triplet rule support.
         Returns (minimum_score, list_of_all_optimal_fingerings).
         """
         if self.n_slices == 0:
+            self.num_solutions = 1
             return 0.0, [[]]
         
         # Get pitches for each slice
-        slice_pitches = []
-        for s in self.hand.slices:
-            pitches = sorted([n.absolute_pitch for n in s.notes])
-            slice_pitches.append(pitches)
+        slice_pitches = self.hand.slice_pitches()
+        
+        # Scales, runs and other purely monophonic passages
+        if self.n_slices >= 2 and all(len(p) == 1 for p in slice_pitches):
+            return self._solve_mono([p[0] for p in slice_pitches])
+        
+        # Valid fingerings for each slice
+        slice_fingerings = lookup_slice_fingerings(slice_pitches)
         
-        # Generate valid fingerings for each slice
-        slice_fingerings = []
-        for pitches in slice_pitches:
-            fingerings = generate_valid_fingerings(len(pitches))
-            slice_fingerings.append(fingerings)
+        # Extended state: (prev_fingers, curr_fingers) for triplet rules, held
+        # as fingering ids (index into slice_fingerings[i]) in dense lists.
+        # State (prev, curr) of slice i lives at cost[curr * n_prev + prev],
+        # so all states sharing a curr fingering are contiguous.
+        n_fingerings = [len(f) for f in slice_fingerings]
+        if self.strict_admissible:
+            admissible = [ADMISSIBLE_MASKS[len(p)][self.is_right] for p in slice_pitches]
         
-        # Extended state: (prev_fingers, curr_fingers) for triplet rules
-        # dp[(prev, curr)] = (cost, list_of_prev_states)
+        # Transition plus intra-slice cost depends only on (prev, curr), so it
+        # is looked up once per slice pair rather than per predecessor
+        trans_matrices = [()] + [
+            slice_transition_matrix(slice_pitches[i-1], slice_pitches[i], self.is_right)
+            for i in range(1, self.n_slices)
+        ]
+        
+        # Branch and bound: triplet costs are never negative, so the cost
+        # still to come after slice i is at least the sum of the cheapest
+        # transitions of the remaining slice pairs
+        if self.upper_bound is not None:
+            rest_lower_bound = [0.0] * self.n_slices
+            for i in range(self.n_slices - 2, -1, -1):
+                rest_lower_bound[i] = rest_lower_bound[i+1] + min(trans_matrices[i+1])
         
         if self.n_slices == 1:
             # Single slice - just intra cost
             best_cost = float('inf')
             best_fingers_list = []
-            for fingers in slice_fingerings[0]:
+            for fid, fingers in enumerate(slice_fingerings[0]):
+                if self.strict_admissible and not (admissible[0] >> fid) & 1:
+                    continue
                 cost = compute_intra_slice_cost(slice_pitches[0], fingers, self.is_right)
                 if len(slice_pitches[0]) == 1:
                     cost += rule_5_score(fingers[0])
@@ -567,307 +1026,327 @@ class FingeringSolverWithTriplets:
                     best_fingers_list = [fingers]
                 elif cost == best_cost:
                     best_fingers_list.append(fingers)
-            return best_cost, [[f] for f in best_fingers_list]
+            if self.upper_bound is not None and best_cost > self.upper_bound:
+                raise ValueError("upper_bound is below the optimal score")
+            self.num_solutions = len(best_fingers_list)
+            return best_cost, [[f] for f in best_fingers_list[:self.max_solutions]]
         
         # Initialize for slice 0 -> 1 transition
         # State is (fingers_at_0, fingers_at_1)
-        dp_prev: Dict[Tuple[Tuple[int, ...], Tuple[int, ...]], Tuple[float, List]] = {}
+        n_prev = n_fingerings[0]
+        cost_prev = [0.0] * (n_prev * n_fingerings[1])
         
-        is_mono_01 = (len(slice_pitches[0]) == 1 and len(slice_pitches[1]) == 1)
-        
-        for f0 in slice_fingerings[0]:
+        for ip, f0 in enumerate(slice_fingerings[0]):
             intra_0 = compute_intra_slice_cost(slice_pitches[0], f0, self.is_right)
             if len(slice_pitches[0]) == 1:
                 intra_0 += rule_5_score(f0[0])
+            if self.strict_admissible and not (admissible[0] >> ip) & 1:
+                intra_0 = float('inf')
             
-            for f1 in slice_fingerings[1]:
-                trans_01 = compute_inter_slice_cost(
+            for ic, f1 in enumerate(slice_fingerings[1]):
+                # Transition 0 -> 1 plus intra-slice cost of slice 1
+                trans_01 = slice_transition_cost(
                     slice_pitches[0], f0,
                     slice_pitches[1], f1,
-                    self.is_right, is_mono_01
+                    self.is_right
                 )
-                intra_1 = compute_intra_slice_cost(slice_pitches[1], f1, self.is_right)
                 
-                cost = intra_0 + trans_01 + intra_1
-                dp_prev[(f0, f1)] = (cost, [None])  # None means start state
+                cost_prev[ic * n_prev + ip] = intra_0 + trans_01
+        
+        if self.strict_admissible:
+            self._drop_inadmissible(cost_prev, admissible[1], n_prev)
+        if self.upper_bound is not None:
+            self._prune(cost_prev, rest_lower_bound[1])
         
-        # Backtrack storage: backtrack[i][(f_prev, f_curr)] = list of (f_prev_prev, f_prev) states
-        backtrack = [{}, {}]
+        # Backtrack storage: backtrack[i][curr * n_prev + prev] = ids of the
+        # slice i-2 fingerings on optimal paths into state (prev, curr)
+        backtrack: List[List[List[int]]] = [[], []]
         
         for i in range(2, self.n_slices):
-            dp_curr: Dict[Tuple[Tuple[int, ...], Tuple[int, ...]], Tuple[float, List]] = {}
-            backtrack.append({})
+            n_pp, n_p, n_c = n_fingerings[i-2], n_fingerings[i-1], n_fingerings[i]
+            cost_curr = [float('inf')] * (n_p * n_c)
+            bt_curr: List[List[int]] = [[]] * (n_p * n_c)
             
             is_mono = all(len(slice_pitches[j]) == 1 for j in range(i-1, i+1))
             is_mono_triplet = all(len(slice_pitches[j]) == 1 for j in range(i-2, i+1))
             
-            for curr_fingers in slice_fingerings[i]:
-                for prev_fingers in slice_fingerings[i-1]:
-                    best_cost = float('inf')
-                    best_prev_states = []
-                    
-                    for (f_prev_prev, f_prev), (prev_cost, _) in dp_prev.items():
-                        if f_prev != prev_fingers:
-                            continue
-                        
-                        # Transition cost
-                        trans_cost = compute_inter_slice_cost(
-                            slice_pitches[i-1], prev_fingers,
-                            slice_pitches[i], curr_fingers,
-                            self.is_right, is_mono
-                        )
-                        
-                        # Intra-slice cost
-                        intra_cost = compute_intra_slice_cost(
-                            slice_pitches[i], curr_fingers, self.is_right
-                        )
-                        
-                        # Triplet costs (rules 3, 4, 12)
-                        triplet_cost = 0.0
-                        if is_mono_triplet:
-                            p1 = slice_pitches[i-2][0]
-                            p2 = slice_pitches[i-1][0]
-                            p3 = slice_pitches[i][0]
-                            f1 = f_prev_prev[0]
-                            f2 = prev_fingers[0]
-                            f3 = curr_fingers[0]
-                            
-                            # Rules 3, 4
-                            triplet_cost += rule_3_score(f1, f2, f3, p1, p2, p3, self.is_right)
-                            triplet_cost += rule_4_score(f1, f3, p1, p3, self.is_right)
-                            
-                            # Rule 12
-                            triplet_cost += rule_12_score(f1, f2, f3, p1, p2, p3)
-                        
-                        # Rules 8, 9 need context - apply here
-                        if is_mono and len(slice_pitches[i-1]) == 1:
-                            p_prev = slice_pitches[i-2][0] if i >= 2 and len(slice_pitches[i-2]) == 1 else None
-                            f_prev_note = f_prev_prev[0] if i >= 2 and len(slice_pitches[i-2]) == 1 else None
-                            p_curr = slice_pitches[i-1][0]
-                            p_next = slice_pitches[i][0]
-                            f_curr_note = prev_fingers[0]
-                            f_next_note = curr_fingers[0]
-                            
-                            triplet_cost += rule_8_score(f_prev_note, f_curr_note, f_next_note,
-                                                         p_prev, p_curr, p_next)
-                            triplet_cost += rule_9_score(f_prev_note, f_curr_note, f_next_note,
-                                                         p_prev, p_curr, p_next)
-                        
-                        total_cost = prev_cost + trans_cost + intra_cost + triplet_cost
+            # Triplet and context rules come from precomputed kernel tables
+            if is_mono_triplet:
+                # Rules 3, 4, 12 and 8, 9 over all (f1, f2, f3); id == finger - 1
+                X = mono_triplet_tensor(slice_pitches[i-2][0], slice_pitches[i-1][0],
+                                        slice_pitches[i][0], self.is_right)
+            elif is_mono:
+                # Rules 8, 9 with no previous single note
+                c_curr = pitch_to_key_color(slice_pitches[i-1][0])
+                c_next = pitch_to_key_color(slice_pitches[i][0])
+            
+            trans_ii = trans_matrices[i]
+            
+            # Previous states sharing the fingering of slice i-1 form one
+            # contiguous bucket, ordered by the fingering of slice i-2
+            buckets = [cost_prev[ip * n_pp:(ip + 1) * n_pp] for ip in range(n_p)]
+            
+            if is_mono_triplet:
+                # Triplet costs (rules 3, 4, 12) and rules 8, 9 vary with f_pp
+                for ic in range(n_c):
+                    for ip, bucket in enumerate(buckets):
+                        trans_cost = trans_ii[ic * n_p + ip]
+                        totals = [prev_cost + trans_cost + X[ipp][ip][ic]
+                                  for ipp, prev_cost in enumerate(bucket)]
+                        best_cost = min(totals)
+                        cost_curr[ic * n_p + ip] = best_cost
+                        bt_curr[ic * n_p + ip] = [ipp for ipp, total in enumerate(totals)
+                                                  if total == best_cost]
+            else:
+                # Remaining costs do not depend on f_pp, so the best
+                # predecessors of a bucket are shared by every curr fingering
+                bucket_best = [min(bucket) for bucket in buckets]
+                # Buckets emptied by branch and bound stay unreachable
+                live = [ip for ip, best in enumerate(bucket_best) if best != float('inf')]
+                bucket_prev = [[ipp for ipp, prev_cost in enumerate(bucket) if prev_cost == best]
+                               for bucket, best in zip(buckets, bucket_best)]
+                
+                prev_fingerings = slice_fingerings[i-1]
+                for ic, curr_fingers in enumerate(slice_fingerings[i]):
+                    for ip in live:
+                        # Rules 8, 9 with no previous single note
+                        if is_mono:
+                            triplet_cost = RULE_8_9_TABLE[
+                                ((prev_fingerings[ip][0] * 6 + curr_fingers[0]) * 4 + c_curr) * 2 + c_next
+                            ]
+                        else:
+                            triplet_cost = 0.0
                         
-                        if total_cost < best_cost:
-                            best_cost = total_cost
-                            best_prev_states = [(f_prev_prev, f_prev)]
-                        elif total_cost == best_cost:
-                            best_prev_states.append((f_prev_prev, f_prev))
-                    
-                    if best_cost < float('inf'):
-                        state = (prev_fingers, curr_fingers)
-                        if state not in dp_curr:
-                            dp_curr[state] = (best_cost, best_prev_states)
-                            backtrack[i][state] = best_prev_states
-                        elif dp_curr[state][0] > best_cost:
-                            dp_curr[state] = (best_cost, best_prev_states)
-                            backtrack[i][state] = best_prev_states
-                        elif dp_curr[state][0] == best_cost:
-                            # Same cost - add more paths
-                            dp_curr[state][1].extend(best_prev_states)
-                            backtrack[i][state].extend(best_prev_states)
+                        cost_curr[ic * n_p + ip] = bucket_best[ip] + trans_ii[ic * n_p + ip] + triplet_cost
+                        bt_curr[ic * n_p + ip] = bucket_prev[ip]
+            
+            if self.strict_admissible:
+                self._drop_inadmissible(cost_curr, admissible[i], n_p)
+            if self.upper_bound is not None:
+                self._prune(cost_curr, rest_lower_bound[i])
             
-            dp_prev = dp_curr
+            cost_prev = cost_curr
+            backtrack.append(bt_curr)
         
         # Find best final state(s)
-        best_final_cost = float('inf')
-        best_final_states = []
-        for state, (cost, _) in dp_prev.items():
-            if cost < best_final_cost:
-                best_final_cost = cost
-                best_final_states = [state]
-            elif cost == best_final_cost:
-                best_final_states.append(state)
+        best_final_cost = min(cost_prev)
+        if best_final_cost == float('inf'):
+            raise ValueError("upper_bound is below the optimal score")
+        best_final_states = [k for k, cost in enumerate(cost_prev) if cost == best_final_cost]
         
         # Backtrack to get all solutions
-        all_solutions = []
-        
-        def backtrack_all(slice_idx: int, state: Tuple[Tuple[int, ...], Tuple[int, ...]], path: List[Tuple[int, ...]]):
-            if slice_idx == 1:
-                # At the beginning - state is (f0, f1)
-                full_path = [state[0], state[1]] + path
-                all_solutions.append(full_path)
-                return
-            
-            prev_states = backtrack[slice_idx].get(state, [])
-            for prev_state in prev_states:
-                if prev_state is None:
-                    continue
-                backtrack_all(slice_idx - 1, prev_state, [state[1]] + path)
+        self.num_solutions = _count_paths(backtrack, best_final_states, n_fingerings)
+        all_solutions = _backtrack_paths(backtrack, best_final_states, slice_fingerings,
+                                         self.max_solutions)
         
-        for final_state in best_final_states:
-            backtrack_all(self.n_slices - 1, final_state, [])
-        
-        # Remove duplicates
-        unique_solutions = []
-        seen = set()
-        for sol in all_solutions:
-            key = tuple(sol)
-            if key not in seen:
-                seen.add(key)
-                unique_solutions.append(sol)
-        
-        return best_final_cost, unique_solutions
+        return best_final_cost, all_solutions
 
 # =============================================================================
 # MusicXML Parser
 # =============================================================================
 
+def spell_pitch(step: str, alter: int) -> Tuple[int, int]:
+    """
+    Map a MusicXML step and alteration to (pitch, octave_shift) in the
+    modified keyboard system.
+    """
+    # Map step to base pitch in modified system
+    # C=0, D=2, E=4, F=6, G=8, A=10, B=12
+    step_map = {'C': 0, 'D': 2, 'E': 4, 'F': 6, 'G': 8, 'A': 10, 'B': 12}
+    pitch = step_map.get(step, 0) + alter
+    octave_shift = 0
+
+    # Handle enharmonic equivalents for imaginary key positions
+    if pitch == 5:  # E# or Fb
+        pitch = 6 if alter > 0 else 4  # E# → F, Fb → E
+    elif pitch == 13:  # B#
+        pitch = 0
+        octave_shift = 1  # B# → C of next octave
+    elif pitch == -1:  # Cb
+        pitch = 12
+        octave_shift = -1  # Cb → B of previous octave
+    return pitch, octave_shift
+
+# (step, alter) -> (pitch, octave_shift) for every spelling up to double
+# sharps and flats; anything else goes through spell_pitch directly
+PITCH_LUT = {
+    (step, alter): spell_pitch(step, alter)
+    for step in 'CDEFGAB'
+    for alter in range(-2, 3)
+}
+
+def _iter_measure_notes(filepath):
+    """
+    Stream the <note> elements that are direct children of a part's measure,
+    freeing each measure once its notes have been read. With lxml, the C
+    parser only reports the end of <note> and <measure> elements; the stdlib
+    parser reports every element and the nesting is tracked here.
+    The parser reads from a read-only memory map of the file, so its chunks
+    come straight from the page cache rather than through a file buffer.
+    """
+    with open(filepath, 'rb') as f:
+        try:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):  # empty or unmappable file: read it directly
+            source = f
+        with source:
+            if lxml_etree is not None:
+                yield from _lxml_measure_notes(source)
+            else:
+                yield from _etree_measure_notes(source)
+
+def _lxml_measure_notes(source):
+    """_iter_measure_notes for lxml: tag-filtered end events, nesting via getparent()."""
+    ns = None
+    for _, elem in lxml_etree.iterparse(source, events=('end',), tag=('{*}note', '{*}measure')):
+        if ns is None:
+            # Handle namespace if present
+            root_tag = elem.getroottree().getroot().tag
+            ns = root_tag.split('}')[0] + '}' if root_tag.startswith('{') else ''
+            part_tag, measure_tag, note_tag = f'{ns}part', f'{ns}measure', f'{ns}note'
+        
+        parent = elem.getparent()
+        if elem.tag == measure_tag:
+            if parent is not None and parent.tag == part_tag:
+                # Measure fully consumed; drop it and the measures before it
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+            continue
+        if elem.tag != note_tag and elem.tag != 'note':
+            continue
+        if parent is None or parent.tag != measure_tag:
+            continue
+        grandparent = parent.getparent()
+        if grandparent is not None and grandparent.tag == part_tag:
+            yield elem
+
+def _etree_measure_notes(source):
+    """_iter_measure_notes for the stdlib parser."""
+    ns = None
+    open_tags = []  # tags of the enclosing elements of the current element
+    
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if ns is None:
+                # Handle namespace if present
+                ns = elem.tag.split('}')[0] + '}' if elem.tag.startswith('{') else ''
+                part_tag, measure_tag, note_tag = f'{ns}part', f'{ns}measure', f'{ns}note'
+            open_tags.append(elem.tag)
+            continue
+        
+        open_tags.pop()
+        if elem.tag == measure_tag and open_tags[-1:] == [part_tag]:
+            # Measure fully consumed; drop it to keep memory flat
+            elem.clear()
+            continue
+        # Only notes that are direct children of a part's measure
+        if elem.tag != note_tag and elem.tag != 'note':
+            continue
+        if open_tags[-2:] == [part_tag, measure_tag]:
+            yield elem
+
+def _children_by_name(elem) -> Dict[str, object]:
+    """
+    First child of elem for each tag name, with any namespace stripped.
+    One pass over the children replaces a namespaced and a plain find()
+    per field.
+    """
+    children = {}
+    for child in elem:
+        tag = child.tag
+        if isinstance(tag, str):  # lxml yields comments with a non-str tag
+            children.setdefault(tag.rpartition('}')[2], child)
+    return children
+
 def parse_musicxml(filepath: str) -> Tuple[Hand, Hand]:
     """
     Parse a MusicXML file and return left and right hand sequences.
+    The file is streamed with _iter_measure_notes instead of building the
+    whole tree first.
     """
-    tree = ET.parse(filepath)
-    root = tree.getroot()
-    
-    # Handle namespace if present
-    ns = ''
-    if root.tag.startswith('{'):
-        ns = root.tag.split('}')[0] + '}'
-    
-    right_notes = []
-    left_notes = []
-    
-    # Find all parts
-    for part in root.findall(f'.//{ns}part'):
-        for measure in part.findall(f'{ns}measure'):
-            # Track timing within measure
-            current_time = 0
-            
-            for elem in measure:
-                if elem.tag == f'{ns}note' or elem.tag == 'note':
-                    # Check if it's a rest
-                    rest = elem.find(f'{ns}rest')
-                    if rest is None:
-                        rest = elem.find('rest')
-                    if rest is not None:
-                        # Skip rests but track duration
-                        dur = elem.find(f'{ns}duration')
-                        if dur is None:
-                            dur = elem.find('duration')
-                        if dur is not None:
-                            current_time += int(dur.text)
-                        continue
-                    
-                    # Get pitch
-                    pitch_elem = elem.find(f'{ns}pitch')
-                    if pitch_elem is None:
-                        pitch_elem = elem.find('pitch')
-                    if pitch_elem is None:
-                        continue
-                    
-                    step = pitch_elem.find(f'{ns}step')
-                    if step is None:
-                        step = pitch_elem.find('step')
-                    octave = pitch_elem.find(f'{ns}octave')
-                    if octave is None:
-                        octave = pitch_elem.find('octave')
-                    alter = pitch_elem.find(f'{ns}alter')
-                    if alter is None:
-                        alter = pitch_elem.find('alter')
-                    
-                    if step is None or octave is None:
-                        continue
-                    
-                    # Convert to modified keyboard system
-                    step_val = step.text.upper()
-                    octave_val = int(octave.text)
-                    alter_val = int(alter.text) if alter is not None else 0
-                    
-                    # Map step to base pitch in modified system
-                    # C=0, D=2, E=4, F=6, G=8, A=10, B=12
-                    step_map = {'C': 0, 'D': 2, 'E': 4, 'F': 6, 'G': 8, 'A': 10, 'B': 12}
-                    pitch = step_map.get(step_val, 0) + alter_val
-
-                    # Handle enharmonic equivalents for imaginary key positions
-                    if pitch == 5:  # E# or Fb
-                        pitch = 6 if alter_val > 0 else 4  # E# → F, Fb → E
-                    elif pitch == 13:  # B#
-                        pitch = 0
-                        octave_val += 1  # B# → C of next octave
-                    elif pitch == -1:  # Cb
-                        pitch = 12
-                        octave_val -= 1  # Cb → B of previous octave
-                    
-                    # Get staff assignment
-                    staff_elem = elem.find(f'{ns}staff')
-                    if staff_elem is None:
-                        staff_elem = elem.find('staff')
-                    staff = int(staff_elem.text) if staff_elem is not None else 1
-                    
-                    # Get duration
-                    dur_elem = elem.find(f'{ns}duration')
-                    if dur_elem is None:
-                        dur_elem = elem.find('duration')
-                    duration = int(dur_elem.text) if dur_elem is not None else 1
-                    
-                    # Get voice
-                    voice_elem = elem.find(f'{ns}voice')
-                    if voice_elem is None:
-                        voice_elem = elem.find('voice')
-                    voice = int(voice_elem.text) if voice_elem is not None else 1
-                    
-                    # Check if chord (simultaneous with previous note)
-                    chord = elem.find(f'{ns}chord')
-                    if chord is None:
-                        chord = elem.find('chord')
-                    is_chord = chord is not None
-                    
-                    note = Note(
-                        pitch=pitch,
-                        octave=octave_val,
-                        duration=duration,
-                        staff=staff,
-                        voice=voice
-                    )
-                    
-                    if staff == 1:
-                        right_notes.append((current_time, note, is_chord))
-                    else:
-                        left_notes.append((current_time, note, is_chord))
-                    
-                    if not is_chord:
-                        current_time += duration
+    # Notes are grouped into slices while streaming: a note opens a new
+    # slice of its hand unless it is a chord note joining the hand's open
+    # slice, so no per-note records are kept once a slice is closed.
+    # Both dicts are keyed by is_right.
+    slices: Dict[bool, List[Slice]] = {True: [], False: []}
+    open_slice: Dict[bool, List[Note]] = {True: [], False: []}
     
-    # Group notes into slices by time
-    def notes_to_slices(notes_with_time: List[Tuple[int, Note, bool]]) -> List[Slice]:
-        if not notes_with_time:
-            return []
+    for elem in _iter_measure_notes(filepath):
+        fields = _children_by_name(elem)
         
-        slices = []
-        current_slice_notes = []
-        current_time = None
+        # Skip rests
+        if 'rest' in fields:
+            continue
         
-        for time, note, is_chord in notes_with_time:
-            if is_chord and current_slice_notes:
-                current_slice_notes.append(note)
-            else:
-                if current_slice_notes:
-                    slices.append(Slice(notes=current_slice_notes))
-                current_slice_notes = [note]
-                current_time = time
+        # Get pitch
+        pitch_elem = fields.get('pitch')
+        if pitch_elem is None:
+            continue
+        
+        pitch_fields = _children_by_name(pitch_elem)
+        step = pitch_fields.get('step')
+        octave = pitch_fields.get('octave')
+        alter = pitch_fields.get('alter')
+        
+        if step is None or octave is None:
+            continue
+        
+        # Convert to modified keyboard system
+        step_val = step.text.upper()
+        octave_val = int(octave.text)
+        alter_val = int(alter.text) if alter is not None else 0
+        
+        # Map step and alteration to a pitch in the modified system
+        spelled = PITCH_LUT.get((step_val, alter_val))
+        if spelled is None:
+            spelled = spell_pitch(step_val, alter_val)
+        pitch, octave_shift = spelled
+        octave_val += octave_shift
+        
+        # Get staff assignment
+        staff_elem = fields.get('staff')
+        staff = int(staff_elem.text) if staff_elem is not None else 1
         
-        if current_slice_notes:
-            slices.append(Slice(notes=current_slice_notes))
+        # Get duration
+        dur_elem = fields.get('duration')
+        duration = int(dur_elem.text) if dur_elem is not None else 1
         
-        return slices
+        # Get voice
+        voice_elem = fields.get('voice')
+        voice = int(voice_elem.text) if voice_elem is not None else 1
+        
+        # Check if chord (simultaneous with previous note)
+        is_chord = 'chord' in fields
+        
+        note = Note(
+            pitch=pitch,
+            octave=octave_val,
+            duration=duration,
+            staff=staff,
+            voice=voice
+        )
+        
+        is_right = staff == 1
+        current = open_slice[is_right]
+        if is_chord and current:
+            current.append(note)
+        else:
+            if current:
+                slices[is_right].append(Slice(notes=tuple(current)))
+            open_slice[is_right] = [note]
     
-    right_slices = notes_to_slices(right_notes)
-    left_slices = notes_to_slices(left_notes)
+    for is_right, current in open_slice.items():
+        if current:
+            slices[is_right].append(Slice(notes=tuple(current)))
     
-    return Hand(slices=right_slices, is_right=True), Hand(slices=left_slices, is_right=False)
+    return Hand(slices=tuple(slices[True]), is_right=True), Hand(slices=tuple(slices[False]), is_right=False)
 
 # =============================================================================
 # Score Calculator
 # =============================================================================
 
+@lru_cache(maxsize=256)
 def pitch_to_note_name(absolute_pitch: int) -> str:
     """Convert absolute pitch back to note name (e.g., C4, F#5)."""
     octave = absolute_pitch // 14
@@ -879,54 +1358,94 @@ def pitch_to_note_name(absolute_pitch: int) -> str:
     
     return f"{pitch_names[pitch_in_octave]}{octave}"
 
-def format_fingering(hand: Hand, fingerings: List[Tuple[int, ...]]) -> List[Dict]:
-    """Format fingering results with note names and finger numbers."""
+def slice_note_names(hand: Hand) -> List[List[str]]:
+    """Note names of every slice, sorted by pitch to match the fingerings."""
+    return [[pitch_to_note_name(p) for p in pitches] for pitches in hand.slice_pitches()]
+
+def format_fingering(hand: Hand, fingerings: List[Tuple[int, ...]],
+                     note_names: Optional[List[List[str]]] = None) -> List[Dict]:
+    """
+    Format fingering results with note names and finger numbers.
+    note_names can be passed in from slice_note_names() when formatting
+    several fingerings of the same hand.
+    """
+    if note_names is None:
+        note_names = slice_note_names(hand)
     result = []
-    for i, (slice_obj, fingers) in enumerate(zip(hand.slices, fingerings)):
-        pitches = sorted([n.absolute_pitch for n in slice_obj.notes])
-        note_names = [pitch_to_note_name(p) for p in pitches]
-        
-        if len(pitches) == 1:
+    for i, (names, fingers) in enumerate(zip(note_names, fingerings)):
+        if len(names) == 1:
             result.append({
                 'position': i + 1,
-                'notes': note_names[0],
+                'notes': names[0],
                 'fingers': fingers[0]
             })
         else:
             result.append({
                 'position': i + 1,
-                'notes': note_names,
+                'notes': names,
                 'fingers': list(fingers)
             })
     return result
 
-def format_fingering_compact(hand: Hand, fingerings: List[Tuple[int, ...]]) -> str:
-    """Format fingering as a compact string: note(finger) note(finger) ..."""
-    parts = []
-    for slice_obj, fingers in zip(hand.slices, fingerings):
-        pitches = sorted([n.absolute_pitch for n in slice_obj.notes])
-        note_names = [pitch_to_note_name(p) for p in pitches]
-        
-        if len(pitches) == 1:
-            parts.append(f"{note_names[0]}({fingers[0]})")
+def compact_templates(note_names: List[List[str]]) -> List[Tuple[str, ...]]:
+    """
+    Fixed text of the compact format for every slice, split around the
+    fingers: slice i renders as templates[i][0] + f0 + templates[i][1] + ...
+    Note names do not change between solutions, so this is built once per
+    hand and only the finger digits are filled in per solution.
+    """
+    templates = []
+    for i, names in enumerate(note_names):
+        sep = " " if i else ""
+        if len(names) == 1:
+            templates.append((f"{sep}{names[0]}(", ")"))
         else:
-            chord_parts = [f"{n}({f})" for n, f in zip(note_names, fingers)]
-            parts.append("[" + " ".join(chord_parts) + "]")
-    return " ".join(parts)
+            templates.append((f"{sep}[{names[0]}(",)
+                             + tuple(f") {n}(" for n in names[1:])
+                             + (")]",))
+    return templates
+
+_FINGER_TEXT = tuple(str(f) for f in range(6))
+
+def _fill_compact(templates: List[Tuple[str, ...]], fingerings: List[Tuple[int, ...]]) -> str:
+    """Render one fingering from compact_templates() output."""
+    parts = []
+    for pieces, fingers in zip(templates, fingerings):
+        for piece, finger in zip(pieces, fingers):
+            parts.append(piece)
+            parts.append(_FINGER_TEXT[finger])
+        parts.append(pieces[-1])
+    return "".join(parts)
+
+def format_fingering_compact(hand: Hand, fingerings: List[Tuple[int, ...]],
+                             note_names: Optional[List[List[str]]] = None) -> str:
+    """Format fingering as a compact string: note(finger) note(finger) ..."""
+    if note_names is None:
+        note_names = slice_note_names(hand)
+    return _fill_compact(compact_templates(note_names), fingerings)
 
 def format_all_fingerings(hand: Hand, all_fingerings: List[List[Tuple[int, ...]]]) -> List[Dict]:
     """Format all optimal fingering solutions."""
-    return [format_fingering(hand, f) for f in all_fingerings]
+    note_names = slice_note_names(hand)
+    return [format_fingering(hand, f, note_names) for f in all_fingerings]
 
 def format_all_fingerings_compact(hand: Hand, all_fingerings: List[List[Tuple[int, ...]]]) -> List[str]:
     """Format all optimal fingerings as compact strings."""
-    return [format_fingering_compact(hand, f) for f in all_fingerings]
+    templates = compact_templates(slice_note_names(hand))
+    return [_fill_compact(templates, f) for f in all_fingerings]
+
+# Default cap on the optimal fingerings listed by the CLI and the Golden Set.
+# Ties can grow exponentially with piece length; num_solutions still reports
+# the exact count.
+MAX_SOLUTIONS = 100
 
-def calculate_optimal_score(filepath: str, verbose: bool = False) -> Dict:
+def calculate_optimal_score(filepath: str, verbose: bool = False,
+                            max_solutions: Optional[int] = None) -> Dict:
     """
     Calculate the optimal fingering score for a MusicXML file.
     Returns a dictionary with scores for each hand and total.
-    Includes all optimal fingerings when there are ties.
+    Includes all optimal fingerings when there are ties, or the first
+    max_solutions of them; num_solutions always counts all of them.
     """
     try:
         right_hand, left_hand = parse_musicxml(filepath)
@@ -957,19 +1476,19 @@ def calculate_optimal_score(filepath: str, verbose: bool = False) -> Dict:
     
     # Solve right hand
     if len(right_hand) > 0:
-        solver = FingeringSolverWithTriplets(right_hand)
+        solver = FingeringSolverWithTriplets(right_hand, max_solutions=max_solutions)
         score, all_fingerings = solver.solve()
         results['right_hand']['score'] = score
-        results['right_hand']['num_solutions'] = len(all_fingerings)
+        results['right_hand']['num_solutions'] = solver.num_solutions
         results['right_hand']['fingerings'] = format_all_fingerings(right_hand, all_fingerings)
         results['right_hand']['fingerings_compact'] = format_all_fingerings_compact(right_hand, all_fingerings)
     
     # Solve left hand
     if len(left_hand) > 0:
-        solver = FingeringSolverWithTriplets(left_hand)
+        solver = FingeringSolverWithTriplets(left_hand, max_solutions=max_solutions)
         score, all_fingerings = solver.solve()
         results['left_hand']['score'] = score
-        results['left_hand']['num_solutions'] = len(all_fingerings)
+        results['left_hand']['num_solutions'] = solver.num_solutions
         results['left_hand']['fingerings'] = format_all_fingerings(left_hand, all_fingerings)
         results['left_hand']['fingerings_compact'] = format_all_fingerings_compact(left_hand, all_fingerings)
     
@@ -977,6 +1496,63 @@ def calculate_optimal_score(filepath: str, verbose: bool = False) -> Dict:
     
     return results
 
+# Results cache: one JSON file per (file content, scorer version)
+def cache_dir() -> Optional[Path]:
+    """
+    Directory of the results cache, or None when neither XDG_CACHE_HOME nor
+    a home directory is available. Resolved per call, so importing this
+    module never depends on the environment.
+    """
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        try:
+            base = Path.home() / '.cache'
+        except RuntimeError:
+            return None
+    return Path(base) / 'piano-fingering'
+
+@lru_cache(maxsize=1)
+def _scorer_version() -> str:
+    """Hash of this module's source, so cached results expire with any scorer change."""
+    return hashlib.blake2b(Path(__file__).read_bytes(), digest_size=8).hexdigest()
+
+def cached_optimal_score(filepath: str, verbose: bool = False,
+                         max_solutions: Optional[int] = None) -> Dict:
+    """
+    calculate_optimal_score backed by an on-disk cache in cache_dir(), keyed
+    by a hash of the file's contents and of the scorer itself. Errors are
+    never cached, and an unreadable cache entry is simply recomputed.
+    """
+    results_dir = cache_dir()
+    if results_dir is None:
+        return calculate_optimal_score(filepath, verbose, max_solutions)
+    try:
+        key = hashlib.blake2b(Path(filepath).read_bytes(), digest_size=16)
+    except OSError:
+        return calculate_optimal_score(filepath, verbose, max_solutions)
+    key.update(f"{_scorer_version()}:{max_solutions}".encode())
+    cache_file = results_dir / f"{key.hexdigest()}.json"
+    
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            result = json.load(f)
+        result['filepath'] = filepath
+        return result
+    except (OSError, ValueError):
+        pass
+    
+    result = calculate_optimal_score(filepath, verbose, max_solutions)
+    if 'error' not in result:
+        try:
+            results_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so concurrent runs never see a partial entry
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(json.dumps(result), encoding='utf-8')
+            tmp_file.replace(cache_file)
+        except OSError:
+            pass
+    return result
+
 # =============================================================================
 # Golden Set Test Runner
 # =============================================================================
@@ -994,9 +1570,100 @@ GOLDEN_SET = [
     ("prokofiev_march_op65_no10.musicxml", "Prokofiev - March Op. 65 No. 10", 400),
 ]
 
-def run_golden_set_tests(test_dir: str = "test_pieces", verbose: bool = False) -> List[Dict]:
+def _list_files(directory: Path) -> Set[str]:
+    """
+    Names of the regular files in directory (empty if it cannot be listed,
+    e.g. it is missing, not a directory or unreadable).
+    One scandir pass instead of a stat per candidate file.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+def iter_golden_set_tests(test_dir: str = "test_pieces", verbose: bool = False,
+                          use_cache: bool = False, jobs: Optional[int] = None,
+                          max_solutions: Optional[int] = MAX_SOLUTIONS) -> Iterator[Dict]:
+    """
+    Score the Golden Set pieces, yielding each result in Golden Set order as
+    soon as it is ready. Missing files yield a 'File not found' error entry.
+    With use_cache, unchanged pieces are read back from the results cache.
+    jobs is the number of worker processes (default: one per CPU), and each
+    piece lists at most max_solutions optimal fingerings per hand.
+    """
+    # Imported here: the process pool machinery pulls in multiprocessing,
+    # which single-file runs, --help and --generate-test never need
+    from concurrent.futures import ProcessPoolExecutor
+    
+    test_path = Path(test_dir)
+    
+    # Pieces are independent and CPU-bound, so score them in a process pool;
+    # map() yields the results lazily in Golden Set order
+    found = {filename for filename, _, _ in GOLDEN_SET} & _list_files(test_path)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        scored = executor.map(
+            partial(cached_optimal_score if use_cache else calculate_optimal_score,
+                    verbose=verbose, max_solutions=max_solutions),
+            [str(test_path / filename) for filename, _, _ in GOLDEN_SET if filename in found]
+        )
+        for filename, title, expected_notes in GOLDEN_SET:
+            if filename not in found:
+                yield {
+                    'title': title,
+                    'filename': filename,
+                    'error': 'File not found',
+                    'expected_notes': expected_notes
+                }
+                continue
+            
+            result = next(scored)
+            result['title'] = title
+            result['expected_notes'] = expected_notes
+            yield result
+
+def _report_golden_piece(result: Dict, filepath: Path) -> None:
+    """Print the report of one Golden Set piece."""
+    print(f"Processing: {result['title']}")
+    print(f"  File: {filepath}")
+    
+    if 'filepath' not in result:
+        # Never scored: the file was missing
+        print(f"  WARNING: File not found, skipping...")
+    elif 'error' in result:
+        print(f"  ERROR: {result['error']}")
+    else:
+        rh = result['right_hand']
+        print(f"  Right Hand: {rh['num_slices']} slices, Score: {rh['score']:.1f}, Solutions: {rh['num_solutions']}")
+        if rh['fingerings_compact']:
+            for i, fingering in enumerate(rh['fingerings_compact'][:3], 1):  # Show up to 3
+                if len(fingering) > 55:
+                    fingering = fingering[:52] + "..."
+                print(f"    [{i}] {fingering}")
+            if rh['num_solutions'] > 3:
+                print(f"    ... and {rh['num_solutions'] - 3} more")
+        
+        lh = result['left_hand']
+        print(f"  Left Hand:  {lh['num_slices']} slices, Score: {lh['score']:.1f}, Solutions: {lh['num_solutions']}")
+        if lh['fingerings_compact']:
+            for i, fingering in enumerate(lh['fingerings_compact'][:3], 1):  # Show up to 3
+                if len(fingering) > 55:
+                    fingering = fingering[:52] + "..."
+                print(f"    [{i}] {fingering}")
+            if lh['num_solutions'] > 3:
+                print(f"    ... and {lh['num_solutions'] - 3} more")
+        
+        print(f"  TOTAL SCORE: {result['total_score']:.1f}")
+    print()
+
+def run_golden_set_tests(test_dir: str = "test_pieces", verbose: bool = False,
+                         use_cache: bool = False, jobs: Optional[int] = None,
+                         max_solutions: Optional[int] = MAX_SOLUTIONS) -> List[Dict]:
     """
     Run optimal score calculation on all Golden Set pieces.
+    With use_cache, unchanged pieces are read back from the results cache.
+    jobs is the number of worker processes (default: one per CPU), and each
+    piece lists at most max_solutions optimal fingerings per hand.
     """
     results = []
     test_path = Path(test_dir)
@@ -1006,52 +1673,10 @@ def run_golden_set_tests(test_dir: str = "test_pieces", verbose: bool = False) -
     print("=" * 70)
     print()
     
-    for filename, title, expected_notes in GOLDEN_SET:
-        filepath = test_path / filename
-        print(f"Processing: {title}")
-        print(f"  File: {filepath}")
-        
-        if not filepath.exists():
-            print(f"  WARNING: File not found, skipping...")
-            results.append({
-                'title': title,
-                'filename': filename,
-                'error': 'File not found',
-                'expected_notes': expected_notes
-            })
-            print()
-            continue
-        
-        result = calculate_optimal_score(str(filepath), verbose)
-        result['title'] = title
-        result['expected_notes'] = expected_notes
+    pieces = iter_golden_set_tests(test_dir, verbose, use_cache, jobs, max_solutions)
+    for (filename, _, _), result in zip(GOLDEN_SET, pieces):
+        _report_golden_piece(result, test_path / filename)
         results.append(result)
-        
-        if 'error' in result:
-            print(f"  ERROR: {result['error']}")
-        else:
-            rh = result['right_hand']
-            print(f"  Right Hand: {rh['num_slices']} slices, Score: {rh['score']:.1f}, Solutions: {rh['num_solutions']}")
-            if rh['fingerings_compact']:
-                for i, fingering in enumerate(rh['fingerings_compact'][:3], 1):  # Show up to 3
-                    if len(fingering) > 55:
-                        fingering = fingering[:52] + "..."
-                    print(f"    [{i}] {fingering}")
-                if rh['num_solutions'] > 3:
-                    print(f"    ... and {rh['num_solutions'] - 3} more")
-            
-            lh = result['left_hand']
-            print(f"  Left Hand:  {lh['num_slices']} slices, Score: {lh['score']:.1f}, Solutions: {lh['num_solutions']}")
-            if lh['fingerings_compact']:
-                for i, fingering in enumerate(lh['fingerings_compact'][:3], 1):  # Show up to 3
-                    if len(fingering) > 55:
-                        fingering = fingering[:52] + "..."
-                    print(f"    [{i}] {fingering}")
-                if lh['num_solutions'] > 3:
-                    print(f"    ... and {lh['num_solutions'] - 3} more")
-            
-            print(f"  TOTAL SCORE: {result['total_score']:.1f}")
-        print()
     
     # Summary table
     print("=" * 70)
@@ -1194,7 +1819,105 @@ def generate_test_piece_simple(filepath: str, piece_type: str = "scale"):
 # Main Entry Point
 # =============================================================================
 
-def main():
+def _stdlib_json(obj) -> bytes:
+    """Indented JSON from the stdlib encoder, which handles integers of any size."""
+    return json.dumps(obj, indent=2).encode()
+
+def _json_encoder() -> Callable[[object], bytes]:
+    """Indented JSON encoder, using orjson's native encoder when installed."""
+    try:
+        import orjson
+    except ImportError:  # orjson is optional; fall back to the stdlib encoder
+        return _stdlib_json
+    
+    def encode(obj) -> bytes:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except TypeError:  # JSONEncodeError, e.g. a num_solutions wider than 64 bits
+            return _stdlib_json(obj)
+    return encode
+
+def write_json(obj) -> None:
+    """Pretty-print obj as JSON on stdout."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(_json_encoder()(obj) + b"\n")
+    sys.stdout.buffer.flush()
+
+def write_json_array(items: Iterable) -> None:
+    """
+    Pretty-print items as a JSON array on stdout, one element at a time as
+    they are produced, in the same layout as write_json(list(items)).
+    """
+    encode = _json_encoder()
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    opening = b"[\n"
+    for item in items:
+        out.write(opening)
+        out.write(b"\n".join(b"  " + line for line in encode(item).split(b"\n")))
+        out.flush()
+        opening = b",\n"
+    out.write(b"[]\n" if opening == b"[\n" else b"\n]\n")
+    out.flush()
+
+# Single-file report fragments; joined with newlines by main()
+_BAR = '=' * 60
+_HAND_TEMPLATE = "\n{bar}\n{hand}\n{bar}\nSlices: {n}\nScore: {s:.1f}\nOptimal Solutions: {k}"
+_TOTAL_TEMPLATE = "\n{bar}\nTOTAL SCORE: {s:.1f}\n{bar}"
+
+# Integer options understood by _fast_parse_args, by destination
+_INT_OPTIONS = {'-j': 'jobs', '--jobs': 'jobs', '--max-solutions': 'max_solutions'}
+
+def _fast_parse_args(argv: Sequence[str]) -> Optional[SimpleNamespace]:
+    """
+    Parse the common scoring invocations (an input plus -v, --json,
+    --no-cache, --test-dir, -j, --max-solutions) without argparse. Returns None for anything
+    else, including --help and --generate-test, so argparse handles it.
+    """
+    args = SimpleNamespace(input=None, test_dir='test_pieces', verbose=False,
+                           generate_test=None, output=None, json=False, no_cache=False,
+                           jobs=None, max_solutions=MAX_SOLUTIONS)
+    argv = iter(argv)
+    for arg in argv:
+        if arg in ('-v', '--verbose'):
+            args.verbose = True
+        elif arg == '--json':
+            args.json = True
+        elif arg == '--no-cache':
+            args.no_cache = True
+        elif arg == '--test-dir':
+            args.test_dir = next(argv, '-')
+            if args.test_dir.startswith('-'):
+                return None
+        elif arg.startswith('--test-dir='):
+            args.test_dir = arg[len('--test-dir='):]
+        elif arg.partition('=')[0] in _INT_OPTIONS:
+            option, eq, value = arg.partition('=')
+            if not eq:
+                value = next(argv, '')
+            elif not option.startswith('--'):
+                return None
+            if not value.isdigit() or int(value) < 1:
+                return None
+            setattr(args, _INT_OPTIONS[option], int(value))
+        elif arg.startswith('-') or args.input is not None:
+            return None
+        else:
+            args.input = arg
+    return args
+
+def _positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        import argparse
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return n
+
+def _parse_args():
     import argparse
     
     parser = argparse.ArgumentParser(
@@ -1229,8 +1952,31 @@ def main():
         action='store_true',
         help="Output results as JSON"
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Always recompute instead of reusing cached results "
+             f"(cache: {cache_dir() or 'unavailable'})"
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=_positive_int,
+        help="Worker processes for the Golden Set (default: one per CPU)"
+    )
+    parser.add_argument(
+        '--max-solutions',
+        type=_positive_int,
+        default=MAX_SOLUTIONS,
+        help=f"List at most this many optimal fingerings per hand (default: {MAX_SOLUTIONS})"
+    )
     
-    args = parser.parse_args()
+    return parser.parse_args()
+
+def main():
+    # argparse startup dominates short runs; only build it when needed
+    args = _fast_parse_args(sys.argv[1:])
+    if args is None:
+        args = _parse_args()
     
     if args.generate_test:
         output = args.output or f"test_{args.generate_test}.musicxml"
@@ -1238,45 +1984,41 @@ def main():
         return
     
     if args.input == 'golden-set' or args.input is None:
-        results = run_golden_set_tests(args.test_dir, args.verbose)
         if args.json:
-            print(json.dumps(results, indent=2))
+            # Stream each piece's result as it completes; the JSON document
+            # is the only output
+            write_json_array(iter_golden_set_tests(args.test_dir, args.verbose, not args.no_cache,
+                                                   args.jobs, args.max_solutions))
+        else:
+            run_golden_set_tests(args.test_dir, args.verbose, not args.no_cache,
+                                 args.jobs, args.max_solutions)
     else:
-        result = calculate_optimal_score(args.input, args.verbose)
+        score_file = calculate_optimal_score if args.no_cache else cached_optimal_score
+        result = score_file(args.input, args.verbose, args.max_solutions)
         if args.json:
-            print(json.dumps(result, indent=2))
+            write_json(result)
         else:
-            print(f"File: {args.input}")
+            # Collect the report and write it at once instead of line by line
+            out = [f"File: {args.input}"]
             if 'error' in result:
-                print(f"Error: {result['error']}")
+                out.append(f"Error: {result['error']}")
             else:
-                print(f"\n{'='*60}")
-                print("RIGHT HAND")
-                print(f"{'='*60}")
-                print(f"Slices: {result['right_hand']['num_slices']}")
-                print(f"Score: {result['right_hand']['score']:.1f}")
-                print(f"Optimal Solutions: {result['right_hand']['num_solutions']}")
-                if result['right_hand']['fingerings_compact']:
-                    for i, fingering in enumerate(result['right_hand']['fingerings_compact'], 1):
-                        print(f"  [{i}] {fingering}")
-                else:
-                    print("  (no notes)")
-                
-                print(f"\n{'='*60}")
-                print("LEFT HAND")
-                print(f"{'='*60}")
-                print(f"Slices: {result['left_hand']['num_slices']}")
-                print(f"Score: {result['left_hand']['score']:.1f}")
-                print(f"Optimal Solutions: {result['left_hand']['num_solutions']}")
-                if result['left_hand']['fingerings_compact']:
-                    for i, fingering in enumerate(result['left_hand']['fingerings_compact'], 1):
-                        print(f"  [{i}] {fingering}")
-                else:
-                    print("  (no notes)")
+                for title, hand_result in (("RIGHT HAND", result['right_hand']),
+                                           ("LEFT HAND", result['left_hand'])):
+                    out.append(_HAND_TEMPLATE.format(
+                        bar=_BAR, hand=title, n=hand_result['num_slices'],
+                        s=hand_result['score'], k=hand_result['num_solutions']))
+                    if hand_result['fingerings_compact']:
+                        out += [f"  [{i}] {fingering}"
+                                for i, fingering in enumerate(hand_result['fingerings_compact'], 1)]
+                        hidden = hand_result['num_solutions'] - len(hand_result['fingerings_compact'])
+                        if hidden:
+                            out.append(f"  ... and {hidden} more")
+                    else:
+                        out.append("  (no notes)")
                 
-                print(f"\n{'='*60}")
-                print(f"TOTAL SCORE: {result['total_score']:.1f}")
-                print(f"{'='*60}")
+                out.append(_TOTAL_TEMPLATE.format(bar=_BAR, s=result['total_score']))
+            sys.stdout.write("\n".join(out) + "\n")
 
 if __name__ == '__main__':
     main()